@@ -1,11 +1,33 @@
 #!/usr/bin/env python3
 import sys
-import requests
 import argparse
-import json
-import openai
+import asyncio
+import aiohttp
+import functools
+import hashlib
 import os
-import base64
+import pathlib
+import re
+import tempfile
+import time
+
+import ijson
+import orjson
+
+# openai (which drags in pydantic and httpx) and tiktoken together add a
+# noticeable chunk of interpreter startup; they are imported lazily at
+# their call sites so runs that never reach the model call (description
+# already set, cache hit, disallowed author) skip the cost entirely
+
+# Matches the error raised by models that reject the temperature parameter;
+# requires "temperature" to follow "Unsupported parameter" so an unrelated
+# mention of temperature does not trigger the retry
+_UNSUPPORTED_TEMP_RE = re.compile(
+    r"Unsupported parameter.*temperature", re.DOTALL)
+
+# Hunk headers carry per-file line numbers, so masking them lets otherwise
+# identical patches (mass renames, codemods) hash to the same digest
+_HUNK_HEADER_RE = re.compile(r"^@@ .*$", re.MULTILINE)
 
 SAMPLE_PROMPT = """
 Write a pull request description focusing on the motivation behind the change and why it improves the project.
@@ -48,6 +70,24 @@ index d495d9fed..00dff28a2 100644
    {
 """
 
+# Everything static lives in the system message so the serialized prompt
+# starts with an invariant prefix; OpenAI's prompt cache is prefix-based and
+# only hits when the leading tokens are byte-identical across runs.
+SYSTEM_INSTRUCTIONS = """You are a world class expert full stack web developer having experience with nodejs, typescript, express who writes pull request descriptions adding 'description' and 'how has this been tested' sections.
+
+Write a concise pull request description focusing on the motivation behind the change so that it is helpful for the reviewer to understand.
+Go straight to the point, avoid verbosity.
+Pull request description should consist of three sections:
+## Description
+This is the concise high level description in one short sentence of the PR. (what).
+
+## Motivation and Context
+Why is this change required? Explain in one short sentence. What problem does it solve? (why)
+
+## Changes
+Go through step by step. What types of changes does your code introduce? Keep it short focusing only on maximum 3 most important changes. (how)
+"""
+
 GOOD_SAMPLE_RESPONSE = """
 ## Description
 This PR addresses malfunctioning sorting functionality on "Principal Investigator" and "PI Email" columns by disabling sorting on them.
@@ -60,7 +100,442 @@ The sorting functionality on "Principal Investigator" and "PI Email" columns was
 """
 
 
-def main():
+# Static sections appended to every generated description; only the Jira
+# link section has per-run content
+HOW_HAS_THIS_BEEN_TESTED_SECTION = "## How Has This Been Tested?\n\n<!--- Please describe in detail how you tested your changes. -->\n<!--- Include details of your testing environment, and the tests you ran to -->\n<!--- see how your change affects other areas of the code, etc. -->"
+DEPENDS_ON_SECTION = "## Depends On\n\n<!--- Does this PR depend on another PR that should be merged first or at the same time -->"
+TESTS_SECTION = "## Tests included/Docs Updated?\n\n<!--- Go over all the following points, and put an `x` in all the boxes that apply. -->\n\n- [ ] I have added tests to cover my changes.\n- [ ] All relevant doc has been updated"
+
+
+def _response_cache_path(pull_request_title, jira_issue_key, pull_request_files):
+    # The same title + Jira key + file blob shas always produce the same
+    # description, so re-runs (rebases, CI retries) can skip the model call
+    key = hashlib.sha256(
+        "\0".join(
+            [pull_request_title, jira_issue_key]
+            + [pull_request_file.get("sha", "")
+               for pull_request_file in pull_request_files]
+        ).encode()
+    ).hexdigest()
+    # The action input defaults to an empty string, treat that as unset
+    cache_dir = pathlib.Path(
+        os.environ.get("INPUT_CACHE_DIR")
+        or os.path.expanduser("~/.cache/pr-autogen")
+    )
+    return cache_dir / f"{key}.md"
+
+
+def _read_cached_description(cache_path):
+    try:
+        return cache_path.read_text()
+    except OSError:
+        return None
+
+
+def _write_cached_description(cache_path, description):
+    try:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        cache_path.write_text(description)
+    except OSError as e:
+        print(f"Failed to write description cache: {e}")
+
+
+@functools.cache
+def _supports_temperature(open_ai_model):
+    # Model families known to reject the temperature parameter; anything not
+    # listed here is still covered by the reactive retry around the API call
+    model_name = open_ai_model.lower()
+    return not ("codex" in model_name or model_name.startswith("gpt-5"))
+
+
+def _token_encoder(open_ai_model):
+    import tiktoken
+
+    try:
+        return tiktoken.encoding_for_model(open_ai_model)
+    except KeyError:
+        # tiktoken does not know every model name, fall back to the current
+        # default encoding
+        return tiktoken.get_encoding("o200k_base")
+
+
+def _strip_redundant_prefix(description):
+    # removeprefix returns the original object on a miss, so the common
+    # case costs a single scan and no copy
+    stripped = description.removeprefix("This pull request ")
+    if stripped is not description and stripped:
+        return stripped[:1].upper() + stripped[1:]
+    return description
+
+
+def _description_suffix(jira_base_url, jira_issue_key):
+    fixes_jira_issue_section = f"## Fixes Jira Issue\n\n[{jira_base_url}/browse/{jira_issue_key}]({jira_base_url}/browse/{jira_issue_key})"
+    return f'\n\n{HOW_HAS_THIS_BEEN_TESTED_SECTION}\n\n{fixes_jira_issue_section}\n\n{DEPENDS_ON_SECTION}\n\n{TESTS_SECTION}'
+
+
+def _batch_spool_path():
+    # The action input defaults to an empty string, treat that as unset
+    return pathlib.Path(
+        os.environ.get("INPUT_BATCH_FILE")
+        or os.path.expanduser("~/.cache/pr-autogen/batch-requests.jsonl")
+    )
+
+
+def _append_batch_request(
+    repo, pull_request_id, github_api_url, jira_base_url, jira_issue_key, request_payload
+):
+    # Everything flush_batch.py needs to submit the request and patch the
+    # result back without re-deriving any of it
+    entry = {
+        "custom_id": f"{repo}#{pull_request_id}",
+        "issues_url": "%s/repos/%s/issues/%s" % (
+            github_api_url,
+            repo,
+            pull_request_id,
+        ),
+        "description_suffix": _description_suffix(jira_base_url, jira_issue_key),
+        "request": request_payload,
+    }
+    spool_path = _batch_spool_path()
+    spool_path.parent.mkdir(parents=True, exist_ok=True)
+    with spool_path.open("ab") as spool_file:
+        spool_file.write(orjson.dumps(entry) + b"\n")
+
+
+def _build_prompt(pull_request_title, task_description, pull_request_files, open_ai_model):
+    # Define an array of filenames to exclude
+    exclude_filenames = ["package-lock.json"]
+
+    # Only the per-PR content goes here; the instructions live in
+    # SYSTEM_INSTRUCTIONS so the cached prompt prefix stays identical.
+    # Collect the pieces in a list and join once at the end: repeated += on
+    # a string can go quadratic with hundreds of multi-KB patches
+    header = f"""
+Below is additional context regarding task from the Jira ticket. Use them to write better description and motivation:
+{task_description}
+
+The title of the pull request is "{pull_request_title}" and the following changes took place: \n
+"""
+
+    max_allowed_tokens = 2048  # Token budget for the variable part of the prompt
+    encoder = _token_encoder(open_ai_model)
+    remaining_tokens = max_allowed_tokens - len(encoder.encode_ordinary(header))
+
+    # Codemod-style PRs repeat the same diff across dozens of files; group
+    # files whose patches are identical modulo hunk positions and spend
+    # tokens on one representative per group instead of every copy
+    patch_groups = {}
+    for pull_request_file in pull_request_files:
+        # Not all PR file metadata entries may contain a patch section
+        # For example, entries related to removed binary files may not contain it
+        if "patch" not in pull_request_file:
+            continue
+
+        filename = pull_request_file["filename"]
+
+        if filename in exclude_filenames:
+            continue
+
+        patch = pull_request_file["patch"]
+        digest = hashlib.blake2b(
+            _HUNK_HEADER_RE.sub("@@", patch).encode(), digest_size=8
+        ).digest()
+        if digest in patch_groups:
+            patch_groups[digest][1].append(filename)
+        else:
+            patch_groups[digest] = (patch, [filename])
+
+    file_parts = []
+    for patch, filenames in patch_groups.values():
+        part = f"Changes in file {filenames[0]}: {patch}\n"
+        if len(filenames) > 1:
+            part += (
+                f"(same change applied to {len(filenames) - 1} additional "
+                f"files: {', '.join(filenames[1:])})\n"
+            )
+        file_parts.append(part)
+
+    # Encode every candidate in one Rust-level call that fans out across
+    # threads (and releases the GIL) instead of a Python-level encode per
+    # file, then budget in real tokens and drop whole files from the tail
+    # rather than slicing the joined string, which used to cut a diff
+    # mid-line
+    token_counts = encoder.encode_ordinary_batch(
+        file_parts, num_threads=os.cpu_count()
+    )
+
+    parts = [header]
+    for part, tokens in zip(file_parts, token_counts):
+        if len(tokens) > remaining_tokens:
+            # Never emit a prompt with no diff content at all: when the
+            # first group alone overflows the budget, include it truncated
+            # to the remaining tokens instead of dropping it
+            if len(parts) == 1 and remaining_tokens > 0:
+                parts.append(encoder.decode(tokens[:remaining_tokens]))
+                remaining_tokens = 0
+            # Smaller groups later in the list may still fit
+            continue
+
+        remaining_tokens -= len(tokens)
+        parts.append(part)
+
+    return "".join(parts)
+
+
+# Only these fields of the pull request are ever read; asking GraphQL for
+# exactly them shrinks the response from tens of KB of REST metadata to a
+# few hundred bytes. The file patches still come from the REST files
+# endpoint since GraphQL does not expose them.
+_PULL_REQUEST_QUERY = """
+query ($owner: String!, $name: String!, $number: Int!) {
+  repository(owner: $owner, name: $name) {
+    pullRequest(number: $number) {
+      body
+      title
+      changedFiles
+      author {
+        login
+      }
+    }
+  }
+}
+"""
+
+
+async def _fetch_pull_request_data(
+    session, github_api_url, repo, pull_request_id, authorization_header
+):
+    owner, _, name = repo.partition("/")
+    async with session.post(
+        f"{github_api_url}/graphql",
+        headers=authorization_header,
+        json={
+            "query": _PULL_REQUEST_QUERY,
+            "variables": {
+                "owner": owner,
+                "name": name,
+                "number": pull_request_id,
+            },
+        },
+    ) as result:
+        if result.status != 200:
+            print(
+                "Request to get pull request data failed: " + str(result.status)
+            )
+            return None
+        # orjson parses the raw bytes directly, skipping the intermediate
+        # str decode aiohttp's .json() would do
+        payload = orjson.loads(await result.read())
+
+    if "errors" in payload:
+        print("Request to get pull request data failed: " +
+              str(payload["errors"]))
+        return None
+
+    pull_request = payload["data"]["repository"]["pullRequest"]
+    author = pull_request["author"] or {}
+    # Normalize to the shape the rest of the code expects
+    return {
+        "body": pull_request["body"],
+        "title": pull_request["title"],
+        "changed_files": pull_request["changedFiles"],
+        "user": {"login": author.get("login", "")},
+    }
+
+
+async def _fetch_files_page(session, url, authorization_header):
+    async with session.get(
+        url,
+        headers=authorization_header,
+    ) as result:
+        if result.status != 200:
+            print(
+                "Request to get list of files failed with error code: "
+                + str(result.status)
+            )
+            return None
+        # Stream-parse the entries as they arrive instead of buffering the
+        # whole page body first; a page of 30 large patches never has to be
+        # held both as raw bytes and as parsed objects at the same time
+        return [
+            pull_request_file
+            async for pull_request_file in ijson.items(result.content, "item")
+        ]
+
+
+async def _fetch_all_file_pages(session, pull_request_url, authorization_header, changed_files):
+    # The changedFiles count from the metadata query tells us exactly how
+    # many 30-file pages exist, so fetch precisely those concurrently: no
+    # probe request to discover the last page, and no hard 10-page cap
+    # silently truncating very large PRs
+    page_count = max(1, (changed_files + 29) // 30)
+    page_urls = [
+        f"{pull_request_url}/files?page={page_num}&per_page=30"
+        for page_num in range(1, page_count + 1)
+    ]
+    pages = await asyncio.gather(
+        *[_fetch_files_page(session, url, authorization_header) for url in page_urls]
+    )
+
+    pull_request_files = []
+    for pull_files_chunk in pages:
+        if pull_files_chunk is None:
+            return None
+
+        if len(pull_files_chunk) == 0:
+            break
+
+        pull_request_files.extend(pull_files_chunk)
+    return pull_request_files
+
+
+# Jira descriptions rarely change between CI retries of the same PR, so a
+# short TTL is enough to skip the round-trip on back-to-back runs
+_JIRA_CACHE_TTL_SECONDS = 3600
+
+# More Jira text than this would only crowd the diffs out of the token
+# budget, so stop extracting once it is reached
+_MAX_JIRA_DESCRIPTION_CHARS = 2000
+
+
+def _extract_jira_description(issue_data, max_chars=_MAX_JIRA_DESCRIPTION_CHARS):
+    description = ""
+
+    if 'fields' in issue_data and 'description' in issue_data['fields']:
+        description_data = issue_data['fields']['description']
+
+        if 'content' in description_data:
+            for content in description_data['content']:
+                if len(description) >= max_chars:
+                    break
+
+                if content['type'] == 'paragraph':
+                    for paragraph_content in content['content']:
+                        if len(description) >= max_chars:
+                            break
+
+                        if paragraph_content['type'] == 'text':
+                            description += paragraph_content['text'] + " "
+
+    return description[:max_chars].strip()
+
+
+def _jira_cache_path(jira_issue_key):
+    cache_dir = pathlib.Path(
+        os.environ.get("RUNNER_TEMP", "/tmp")) / "jira-cache"
+    return cache_dir / f"{jira_issue_key}.txt"
+
+
+def _read_cached_jira_description(jira_issue_key):
+    cache_path = _jira_cache_path(jira_issue_key)
+    try:
+        if time.time() - cache_path.stat().st_mtime < _JIRA_CACHE_TTL_SECONDS:
+            return cache_path.read_text()
+    except OSError:
+        pass
+    return None
+
+
+def _write_cached_jira_description(jira_issue_key, description):
+    cache_path = _jira_cache_path(jira_issue_key)
+    try:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        # Write to a temporary file and rename so a concurrent run never
+        # observes a half-written cache entry
+        with tempfile.NamedTemporaryFile(
+            "w", dir=cache_path.parent, delete=False
+        ) as tmp_file:
+            tmp_file.write(description)
+        os.replace(tmp_file.name, cache_path)
+    except OSError as e:
+        print(f"Failed to write Jira description cache: {e}")
+
+
+async def _fetch_jira_task_description(session, jira_base_url, jira_issue_key, jira_api_token):
+    cached_description = _read_cached_jira_description(jira_issue_key)
+    if cached_description is not None:
+        print("Using cached Jira issue description")
+        return cached_description
+
+    # Create the headers with basic authentication using the API token
+    headers = {
+        'Authorization': f'Bearer {jira_api_token}',
+        'Content-Type': 'application/json',
+    }
+
+    # Construct the URL for the Jira issue
+    url = f'{jira_base_url}/rest/api/2/issue/{jira_issue_key}'
+
+    try:
+        # Send a GET request to retrieve the issue details
+        async with session.get(url, headers=headers) as response:
+            print(
+                f'Jira issue description request status code: {response.status}')
+
+            if response.status != 200:
+                print(
+                    f"Failed to fetch Jira issue description. Response: {await response.text()}")
+                return ""
+
+            issue_data = orjson.loads(await response.read())
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        # Jira context is best-effort; a flaky or slow Jira must never fail
+        # the whole action
+        print(f"Connection error: {e}")
+        print("No response received. Setting task description to an empty string.")
+        return ""
+
+    description = _extract_jira_description(issue_data)
+    _write_cached_jira_description(jira_issue_key, description)
+    return description
+
+
+async def _fetch_pull_request_context(
+    session,
+    github_api_url,
+    repo,
+    pull_request_id,
+    pull_request_url,
+    authorization_header,
+    jira_base_url,
+    jira_issue_key,
+    jira_api_token,
+    allowed_users,
+):
+    # The PR metadata and the Jira issue are independent, fetch them in
+    # parallel; the files pagination needs the changed-file count and is
+    # kicked off once the PR data confirms the run should proceed.
+    jira_task = asyncio.create_task(
+        _fetch_jira_task_description(
+            session, jira_base_url, jira_issue_key, jira_api_token)
+    )
+    pull_request_data = await _fetch_pull_request_data(
+        session, github_api_url, repo, pull_request_id, authorization_header
+    )
+
+    # A PR that already has a description is the common no-op rerun; drop
+    # the in-flight Jira request and never start the files pagination
+    if pull_request_data is None or pull_request_data["body"]:
+        jira_task.cancel()
+        return pull_request_data, None, None
+
+    # A disallowed author exits just as early in main_async, so stop here
+    # too rather than paying for files pages it will never look at
+    if allowed_users and pull_request_data["user"]["login"] not in allowed_users:
+        jira_task.cancel()
+        return pull_request_data, None, None
+
+    pull_request_files, task_description = await asyncio.gather(
+        _fetch_all_file_pages(
+            session, pull_request_url, authorization_header,
+            pull_request_data["changed_files"],
+        ),
+        jira_task,
+    )
+    return pull_request_data, pull_request_files, task_description
+
+
+async def main_async():
     parser = argparse.ArgumentParser(
         description="Use ChatGPT to generate a description for a pull request."
     )
@@ -130,6 +605,7 @@ def main():
     open_ai_model = os.environ.get("INPUT_OPENAI_MODEL", "gpt-3.5-turbo")
     max_prompt_tokens = int(os.environ.get("INPUT_MAX_TOKENS", "1000"))
     model_temperature = float(os.environ.get("INPUT_TEMPERATURE", "0.6"))
+    batch_mode = os.environ.get("INPUT_BATCH_MODE", "false").lower() == "true"
     model_sample_prompt = os.environ.get(
         "INPUT_MODEL_SAMPLE_PROMPT", SAMPLE_PROMPT)
     model_sample_response = os.environ.get(
@@ -141,190 +617,129 @@ def main():
     }
 
     pull_request_url = f"{github_api_url}/repos/{repo}/pulls/{pull_request_id}"
-    pull_request_result = requests.get(
-        pull_request_url,
-        headers=authorization_header,
-    )
-    if pull_request_result.status_code != requests.codes.ok:
-        print(
-            "Request to get pull request data failed: "
-            + str(pull_request_result.status_code)
-        )
-        return 1
-    pull_request_data = json.loads(pull_request_result.text)
-
-    if pull_request_data["body"]:
-        print("Pull request already has a description, skipping")
-        return 0
-
-    if allowed_users:
-        pr_author = pull_request_data["user"]["login"]
-        if pr_author not in allowed_users:
-            print(
-                f"Pull request author {pr_author} is not allowed to trigger this action"
-            )
-            return 0
-
-    pull_request_title = pull_request_data["title"]
 
-    pull_request_files = []
-    # Request a maximum of 10 pages (300 files)
-    for page_num in range(1, 11):
-        pull_files_url = f"{pull_request_url}/files?page={page_num}&per_page=30"
-        pull_files_result = requests.get(
-            pull_files_url,
-            headers=authorization_header,
+    # One session for every HTTP call in the run (GitHub GETs, Jira, final
+    # PATCH) so the pooled connections are reused instead of paying a fresh
+    # TCP + TLS handshake per request
+    async with aiohttp.ClientSession(
+        connector=aiohttp.TCPConnector(limit=20),
+        timeout=aiohttp.ClientTimeout(total=20),
+    ) as session:
+        pull_request_data, pull_request_files, task_description = await _fetch_pull_request_context(
+            session,
+            github_api_url,
+            repo,
+            pull_request_id,
+            pull_request_url,
+            authorization_header,
+            jira_base_url,
+            jira_issue_key,
+            jira_api_token,
+            allowed_users,
         )
-
-        if pull_files_result.status_code != requests.codes.ok:
-            print(
-                "Request to get list of files failed with error code: "
-                + str(pull_files_result.status_code)
-            )
+        if pull_request_data is None:
             return 1
 
-        pull_files_chunk = json.loads(pull_files_result.text)
-
-        if len(pull_files_chunk) == 0:
-            break
-
-        pull_request_files.extend(pull_files_chunk)
-
-        # Create the headers with basic authentication using the API token
-        headers = {
-            'Authorization': f'Bearer {jira_api_token}',
-            'Content-Type': 'application/json',
-        }
-
-        # Construct the URL for the Jira issue
-        url = f'{jira_base_url}/rest/api/2/issue/{jira_issue_key}'
-
-        try:
-            # Send a GET request to retrieve the issue details
-            response = requests.get(url, headers=headers)
-        except requests.exceptions.ConnectionError as e:
-            print(f"Connection error: {e}")
-            response = ""  # Set response to an empty string
-
-        if response:
-            print(
-                f'Jira issue description request status code: {response.status_code}')
-
-            if response.status_code == 200:
-                issue_data = response.json()
-                description = ""
-
-                if 'fields' in issue_data and 'description' in issue_data['fields']:
-                    description_data = issue_data['fields']['description']
-
-                    if 'content' in description_data:
-                        for content in description_data['content']:
-                            if content['type'] == 'paragraph':
-                                for paragraph_content in content['content']:
-                                    if paragraph_content['type'] == 'text':
-                                        description += paragraph_content['text'] + " "
+        if pull_request_data["body"]:
+            print("Pull request already has a description, skipping")
+            return 0
 
-                task_description = description.strip()  # Print the description
-            else:
+        if allowed_users:
+            pr_author = pull_request_data["user"]["login"]
+            if pr_author not in allowed_users:
                 print(
-                    f"Failed to fetch Jira issue description. Response: {response.text}")
-                task_description = ""
-        else:
-            print("No response received. Setting task description to an empty string.")
-            task_description = ""
-
-        # Define an array of filenames to exclude
-        exclude_filenames = ["package-lock.json"]
-
-        completion_prompt = f""" 
-Write a concise pull request description focusing on the motivation behind the change so that it is helpful for the reviewer to understand.
-Go straight to the point, avoid verbosity.
-Pull request description should consist of three sections:
-## Description
-This is the concise high level description in one short sentence of the PR. (what).
-
-## Motivation and Context
-Why is this change required? Explain in one short sentence. What problem does it solve? (why)
-
-## Changes
-Go through step by step. What types of changes does your code introduce? Keep it short focusing only on maximum 3 most important changes. (how)
+                    f"Pull request author {pr_author} is not allowed to trigger this action"
+                )
+                return 0
 
-Below is additional context regarding task from the Jira ticket. Use them to write better description and motivation: 
-{task_description}
+        pull_request_title = pull_request_data["title"]
 
-The title of the pull request is "{pull_request_title}" and the following changes took place: \n
-"""
-    for pull_request_file in pull_request_files:
-        # Not all PR file metadata entries may contain a patch section
-        # For example, entries related to removed binary files may not contain it
-        if "patch" not in pull_request_file:
-            continue
-
-        filename = pull_request_file["filename"]
-
-        if filename in exclude_filenames:
-            continue
-
-        patch = pull_request_file["patch"]
-        completion_prompt += f"Changes in file {filename}: {patch}\n"
-
-    max_allowed_tokens = 2048  # 4096 is the maximum allowed by OpenAI for GPT-3.5
-    characters_per_token = 4  # The average number of characters per token
-    max_allowed_characters = max_allowed_tokens * characters_per_token
-    if len(completion_prompt) > max_allowed_characters:
-        completion_prompt = completion_prompt[:max_allowed_characters]
-
-    print(f"Using model: '{open_ai_model}'")
-
-    openai.api_key = openai_api_key
-    openai_response = openai.ChatCompletion.create(
-        model=open_ai_model,
-        messages=[
-            {
-                "role": "system",
-                "content": "You are a world class expert full stack web developer having experience with nodejs, typescript, express who writes pull request descriptions adding 'description' and 'how has this been tested' sections.",
-            },
-            {"role": "user", "content": model_sample_prompt},
-            {"role": "assistant", "content": model_sample_response},
-            {"role": "user", "content": completion_prompt},
-        ],
-        temperature=model_temperature,
-        max_tokens=max_prompt_tokens,
-    )
+        if pull_request_files is None:
+            return 1
 
-    generated_pr_description = openai_response.choices[0].message.content
-    redundant_prefix = "This pull request "
-    if generated_pr_description.startswith(redundant_prefix):
-        generated_pr_description = generated_pr_description[len(
-            redundant_prefix):]
-        generated_pr_description = (
-            generated_pr_description[0].upper() + generated_pr_description[1:]
+        cache_path = _response_cache_path(
+            pull_request_title, jira_issue_key, pull_request_files
         )
-    how_has_this_been_tested_section = "## How Has This Been Tested?\n\n<!--- Please describe in detail how you tested your changes. -->\n<!--- Include details of your testing environment, and the tests you ran to -->\n<!--- see how your change affects other areas of the code, etc. -->"
-    fixes_jira_issue_section = f"## Fixes Jira Issue\n\n[{jira_base_url}/browse/{jira_issue_key}]({jira_base_url}/browse/{jira_issue_key})"
-    depends_on_section = "## Depends On\n\n<!--- Does this PR depend on another PR that should be merged first or at the same time -->"
-    tests_section = "## Tests included/Docs Updated?\n\n<!--- Go over all the following points, and put an `x` in all the boxes that apply. -->\n\n- [ ] I have added tests to cover my changes.\n- [ ] All relevant doc has been updated"
-    generated_pr_description = f'{generated_pr_description}\n\n{how_has_this_been_tested_section}\n\n{fixes_jira_issue_section}\n\n{depends_on_section}\n\n{tests_section}'
-    print(f"Generated pull request description: '{generated_pr_description}'")
-    issues_url = "%s/repos/%s/issues/%s" % (
-        github_api_url,
-        repo,
-        pull_request_id,
-    )
-    update_pr_description_result = requests.patch(
-        issues_url,
-        headers=authorization_header,
-        json={"body": generated_pr_description},
-    )
+        generated_pr_description = _read_cached_description(cache_path)
+        if generated_pr_description is not None:
+            print("Found a cached pull request description, skipping the model call")
+        else:
+            completion_prompt = _build_prompt(
+                pull_request_title, task_description, pull_request_files, open_ai_model
+            )
 
-    if update_pr_description_result.status_code != requests.codes.ok:
+            print(f"Using model: '{open_ai_model}'")
+
+            request_payload = {
+                "model": open_ai_model,
+                "input": [
+                    {"role": "system", "content": SYSTEM_INSTRUCTIONS},
+                    {"role": "user", "content": model_sample_prompt},
+                    {"role": "assistant", "content": model_sample_response},
+                    {"role": "user", "content": completion_prompt},
+                ],
+                "max_output_tokens": max_prompt_tokens,
+            }
+            if _supports_temperature(open_ai_model):
+                request_payload["temperature"] = model_temperature
+
+            if batch_mode:
+                # Queue the request for a cheaper asynchronous Batch API
+                # submission via flush_batch.py instead of calling the model
+                _append_batch_request(
+                    repo,
+                    pull_request_id,
+                    github_api_url,
+                    jira_base_url,
+                    jira_issue_key,
+                    request_payload,
+                )
+                print(
+                    f"Batch mode: queued request for pull request {pull_request_id}, "
+                    "run flush_batch.py to submit"
+                )
+                return 0
+
+            from openai import AsyncOpenAI, BadRequestError
+
+            client = AsyncOpenAI(api_key=openai_api_key)
+            try:
+                openai_response = await client.responses.create(**request_payload)
+            except BadRequestError as error:
+                # Newer models (e.g. gpt-5, codex) reject the temperature parameter,
+                # retry once without it
+                unsupported_temperature = bool(
+                    _UNSUPPORTED_TEMP_RE.search(str(error)))
+                if not unsupported_temperature:
+                    raise
+                request_payload.pop("temperature", None)
+                openai_response = await client.responses.create(**request_payload)
+
+            generated_pr_description = openai_response.output_text
+            _write_cached_description(cache_path, generated_pr_description)
+        generated_pr_description = _strip_redundant_prefix(
+            generated_pr_description
+        ) + _description_suffix(jira_base_url, jira_issue_key)
         print(
-            "Request to update pull request description failed: "
-            + str(update_pr_description_result.status_code)
+            f"Generated pull request description: '{generated_pr_description}'")
+        issues_url = "%s/repos/%s/issues/%s" % (
+            github_api_url,
+            repo,
+            pull_request_id,
         )
-        print("Response: " + update_pr_description_result.text)
-        return 1
+        async with session.patch(
+            issues_url,
+            headers=authorization_header,
+            json={"body": generated_pr_description},
+        ) as update_pr_description_result:
+            if update_pr_description_result.status != 200:
+                print(
+                    "Request to update pull request description failed: "
+                    + str(update_pr_description_result.status)
+                )
+                print("Response: " + await update_pr_description_result.text())
+                return 1
 
 
 if __name__ == "__main__":
-    sys.exit(main())
+    sys.exit(asyncio.run(main_async()))
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""Submit queued pull request description requests as one OpenAI batch.
+
+When INPUT_BATCH_MODE is true, autofill_description.py appends one JSON line
+per pull request to a spool file instead of calling the model. This script
+uploads the queued requests as a single OpenAI Batch (half the price of
+synchronous calls), optionally waits for completion, and patches each pull
+request body with its generated description.
+"""
+import sys
+import argparse
+import asyncio
+
+import aiohttp
+import orjson
+from openai import AsyncOpenAI
+
+from autofill_description import _batch_spool_path, _strip_redundant_prefix
+
+# Batch statuses that mean the batch will make no further progress
+_FINAL_BATCH_STATUSES = ("completed", "failed", "expired", "cancelled")
+
+
+def _load_spool(spool_path):
+    with spool_path.open("rb") as spool_file:
+        return [orjson.loads(line) for line in spool_file if line.strip()]
+
+
+def _output_text(response_body):
+    # The raw batch output carries the full Responses API body; collect the
+    # text parts the same way the SDK's output_text property does
+    parts = []
+    for item in response_body.get("output", []):
+        if item.get("type") != "message":
+            continue
+        for content in item.get("content", []):
+            if content.get("type") == "output_text":
+                parts.append(content.get("text", ""))
+    return "".join(parts)
+
+
+async def main_async():
+    parser = argparse.ArgumentParser(
+        description="Submit queued PR description requests as an OpenAI batch."
+    )
+    parser.add_argument(
+        "--github-token",
+        type=str,
+        required=True,
+        help="The GitHub token",
+    )
+    parser.add_argument(
+        "--openai-api-key",
+        type=str,
+        required=True,
+        help="The OpenAI API key",
+    )
+    parser.add_argument(
+        "--wait",
+        action="store_true",
+        help="Wait for the batch to finish and patch the pull request bodies",
+    )
+    parser.add_argument(
+        "--poll-interval",
+        type=int,
+        default=60,
+        help="Seconds between batch status checks when waiting",
+    )
+
+    args = parser.parse_args()
+
+    spool_path = _batch_spool_path()
+    if not spool_path.is_file():
+        print("No queued batch requests, nothing to do")
+        return 0
+
+    entries = _load_spool(spool_path)
+    if not entries:
+        print("No queued batch requests, nothing to do")
+        return 0
+
+    # Action reruns append a fresh entry for the same PR; the Batch API
+    # rejects duplicate custom_ids, so keep only the newest one per PR
+    entries = list({entry["custom_id"]: entry for entry in entries}.values())
+
+    client = AsyncOpenAI(api_key=args.openai_api_key)
+
+    batch_input = b"".join(
+        orjson.dumps(
+            {
+                "custom_id": entry["custom_id"],
+                "method": "POST",
+                "url": "/v1/responses",
+                "body": entry["request"],
+            }
+        )
+        + b"\n"
+        for entry in entries
+    )
+    input_file = await client.files.create(
+        file=("batch-requests.jsonl", batch_input),
+        purpose="batch",
+    )
+    batch = await client.batches.create(
+        input_file_id=input_file.id,
+        endpoint="/v1/responses",
+        completion_window="24h",
+    )
+    print(f"Submitted batch {batch.id} with {len(entries)} requests")
+
+    # Keep the spool until the batch is past input validation; unlinking
+    # earlier would silently drop every queued description if validation
+    # fails, which is only observable when waiting
+    while batch.status == "validating":
+        await asyncio.sleep(5)
+        batch = await client.batches.retrieve(batch.id)
+
+    if batch.status == "failed":
+        print(f"Batch {batch.id} failed validation, keeping the spool")
+        return 1
+
+    spool_path.unlink()
+
+    if not args.wait:
+        return 0
+
+    while batch.status not in _FINAL_BATCH_STATUSES:
+        await asyncio.sleep(args.poll_interval)
+        batch = await client.batches.retrieve(batch.id)
+        print(f"Batch {batch.id} status: {batch.status}")
+
+    if batch.status != "completed":
+        print(f"Batch {batch.id} did not complete: {batch.status}")
+        return 1
+
+    output = await client.files.content(batch.output_file_id)
+
+    descriptions = {}
+    for line in output.text.splitlines():
+        result = orjson.loads(line)
+        response = result.get("response") or {}
+        if response.get("status_code") != 200:
+            print(
+                f"Request {result.get('custom_id')} failed: "
+                + str(response.get("status_code"))
+            )
+            continue
+        descriptions[result["custom_id"]] = _output_text(response["body"])
+
+    authorization_header = {
+        "Accept": "application/vnd.github.v3+json",
+        "Authorization": "token %s" % args.github_token,
+    }
+
+    failures = 0
+    async with aiohttp.ClientSession(
+        timeout=aiohttp.ClientTimeout(total=20)
+    ) as session:
+        for entry in entries:
+            generated_pr_description = descriptions.get(entry["custom_id"])
+            if not generated_pr_description:
+                print(f"No description generated for {entry['custom_id']}")
+                failures += 1
+                continue
+
+            generated_pr_description = _strip_redundant_prefix(
+                generated_pr_description
+            ) + entry["description_suffix"]
+
+            async with session.patch(
+                entry["issues_url"],
+                headers=authorization_header,
+                json={"body": generated_pr_description},
+            ) as result:
+                if result.status != 200:
+                    print(
+                        f"Request to update {entry['custom_id']} failed: "
+                        + str(result.status)
+                    )
+                    failures += 1
+
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main_async()))